@@ -1,52 +1,183 @@
+import numpy as np
 import pandas as pd
+import os
 import sqlite3
+from datetime import datetime
 import seaborn as sns
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 
-def load_and_preprocess_data(file_path):
+# pyarrow is optional: it provides the multithreaded CSV reader and the Parquet cache of the preprocessed data
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+CSV_DTYPES = {'FlightNumber': 'str', 'Airline': 'str', 'DelayMinutes': 'float32'}
+# Dates and times are kept as strings by the pyarrow reader so that they are parsed the same way as with the C engine
+STRING_COLUMNS = ['FlightNumber', 'DepartureDate', 'DepartureTime', 'ArrivalDate', 'ArrivalTime', 'Airline']
+# The strings pandas' read_csv treats as missing by default, passed to the pyarrow reader so that both readers agree
+CSV_NULL_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                   '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+CATEGORICAL_COLUMNS = ['FlightNumber', 'Airline']
+
+DATE_FORMATS = ['%m/%d/%Y', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d']
+
+def detect_date_format(series):
+    # Detecting the date format once from a sample entry so that the whole column can be parsed with an explicit format
+    sample = series.dropna()
+    if sample.empty:
+        return None
+    sample = str(sample.iloc[0]).strip()
+    # ISO 8601 dates are handed to pandas' C ISO parser, which never falls back to dateutil
     try:
-        # Reading data from a CSV file into a Pandas DataFrame
-        data = pd.read_csv(file_path)
-        # Storing a copy of the dataframe as backup
-        backup = data.copy()
+        datetime.fromisoformat(sample)
+        return 'ISO8601'
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            datetime.strptime(sample, fmt)
+            return fmt
+        except ValueError:
+            continue
+    return None
+
+def read_csv_chunks(file_path, chunksize):
+    # Reading the CSV file in chunks, using pyarrow's multithreaded CSV reader when it is installed
+    if not PYARROW_AVAILABLE:
+        yield from pd.read_csv(file_path, chunksize=chunksize, dtype=CSV_DTYPES)
+        return
+    column_types = {column: pa.string() for column in STRING_COLUMNS}
+    column_types['DelayMinutes'] = pa.float32()
+    convert_options = pa_csv.ConvertOptions(column_types=column_types, null_values=CSV_NULL_VALUES, strings_can_be_null=True)
+    # pyarrow batches by bytes, so the block size is estimated from the average row length in the start of the file
+    with open(file_path, 'rb') as f:
+        sample = f.read(1 << 16)
+    row_bytes = max(1, len(sample) // max(1, sample.count(b'\n')))
+    read_options = pa_csv.ReadOptions(block_size=min(chunksize * row_bytes, 1 << 30))
+    with pa_csv.open_csv(file_path, read_options=read_options, convert_options=convert_options) as reader:
+        for batch in reader:
+            yield batch.to_pandas()
+
+def parse_times(series, time_format='%I:%M %p'):
+    # Parsing each distinct time string only once (a day has at most 1440 of them) and mapping the results back onto the rows
+    codes, unique_times = pd.factorize(series)
+    parsed_times = pd.to_datetime(unique_times, format=time_format, errors='coerce')
+    # Missing times have code -1 and are filled with NaT, and an empty series still comes back as datetime64
+    return pd.Series(parsed_times.take(codes, allow_fill=True, fill_value=pd.NaT), index=series.index, name=series.name)
+
+def combine_date_time(dates, times):
+    # Adding the time of day of each parsed time to its date using only datetime64/timedelta64 arrays, so missing values stay NaT
+    times = times.to_numpy(dtype='datetime64[m]')
+    return dates.to_numpy(dtype='datetime64[m]') + (times - times.astype('datetime64[D]'))
+
+def preprocess_chunk(data, date_format):
+    # Preprocessing a single chunk of rows read from the CSV file
+    # Converting dates and times to DateTime objects
+    # Parsing both date columns in a single call so that they share one parse and one cache of repeated dates
+    dates = pd.concat([data['DepartureDate'], data['ArrivalDate']], ignore_index=True)
+    dates = pd.to_datetime(dates, format=date_format, cache=True, errors='coerce').to_numpy()
+    data['DepartureDate'] = dates[:len(data)]
+    data['ArrivalDate'] = dates[len(data):]
+    data['DepartureTime'] = parse_times(data['DepartureTime'])
+    data['ArrivalTime'] = parse_times(data['ArrivalTime'])
+    
+    # Calculating FlightDuration by combining each date and time into a single datetime64 value
+    duration = combine_date_time(data['ArrivalDate'], data['ArrivalTime']) - combine_date_time(data['DepartureDate'], data['DepartureTime'])
+    valid = ~np.isnat(duration)
+    delta_min = np.where(valid, duration.astype('int64'), 0)
+    # Formatting the duration as HH:MM (hours wrap at a day, as with Timedelta components)
+    hours = np.char.mod('%02d', (delta_min // 60) % 24)
+    minutes = np.char.mod('%02d', delta_min % 60)
+    data['FlightDuration'] = np.char.add(np.char.add(hours, ':'), minutes)
+    data['FlightDuration (Minutes)'] = np.where(valid, delta_min.astype(float), np.nan)
+    
+    # Converting times to 24-hour format
+    data['DepartureTime'] = data['DepartureTime'].dt.strftime('%H:%M')
+    data['ArrivalTime'] = data['ArrivalTime'].dt.strftime('%H:%M')
+    
+    return data
+
+def load_and_preprocess_data(file_path, chunksize=200_000):
+    try:
+        # Reading data from a CSV file in chunks and preprocessing each chunk as it is read
+        chunks = []
+        date_format = None
+        for chunk in read_csv_chunks(file_path, chunksize):
+            if date_format is None:
+                date_format = detect_date_format(chunk['DepartureDate'])
+            chunks.append(preprocess_chunk(chunk, date_format))
+        if not chunks:
+            # A file with only a header row may yield no chunks, so its empty frame is preprocessed to keep the expected columns
+            chunks.append(preprocess_chunk(pd.read_csv(file_path, nrows=0, dtype=CSV_DTYPES), date_format))
+        data = pd.concat(chunks, ignore_index=True)
+        # Storing the repeated FlightNumber and Airline labels as categories once all chunks share the same values
+        data[CATEGORICAL_COLUMNS] = data[CATEGORICAL_COLUMNS].astype('category')
         # Sorting the entries by FlightNumber to ensure they are grouped logically.
         data.sort_values(by='FlightNumber', inplace=True)
         
-        # Converting dates and times to DateTime objects
-        data['DepartureDate'] = pd.to_datetime(data['DepartureDate'], errors='coerce')
-        data['ArrivalDate'] = pd.to_datetime(data['ArrivalDate'], errors='coerce')
-        data['DepartureTime'] = pd.to_datetime(data['DepartureTime'], format='%I:%M %p', errors='coerce')
-        data['ArrivalTime'] = pd.to_datetime(data['ArrivalTime'], format='%I:%M %p', errors='coerce')
-        
-        # Calculating FlightDuration
-        data['FlightDuration'] = (
-            (data['ArrivalDate'] + (data['ArrivalTime'] - pd.Timestamp('1970-01-01'))) -
-            (data['DepartureDate'] + (data['DepartureTime'] - pd.Timestamp('1970-01-01')))
-        )
-        data['FlightDuration (Minutes)'] = data['FlightDuration'].dt.total_seconds() / 60
-        data['FlightDuration'] = data['FlightDuration'].apply(
-            lambda x: f"{x.components.hours:02}:{x.components.minutes:02}" if pd.notnull(x) else '00:00'
-        )
-        
-        # Converting times to 24-hour format
-        data['DepartureTime'] = data['DepartureTime'].dt.strftime('%H:%M')
-        data['ArrivalTime'] = data['ArrivalTime'].dt.strftime('%H:%M')
-        
         return data
     except Exception as e:
         print(f"Error loading and preprocessing data: {e}")
         return pd.DataFrame()
 
+def load_with_cache(file_path, cache_path=None):
+    # Reusing the preprocessed data from a Parquet cache (flights.csv -> flights.cache.parquet) while the CSV file is unchanged since it was written
+    if not PYARROW_AVAILABLE:
+        return load_and_preprocess_data(file_path)
+    if cache_path is None:
+        cache_path = os.path.splitext(file_path)[0] + '.cache.parquet'
+    signature = None
+    try:
+        # The signature ties the cache to this exact file and also catches files replaced with their modification time preserved
+        stat = os.stat(file_path)
+        signature = f"{os.path.abspath(file_path)}:{stat.st_size}:{stat.st_mtime}"
+        if os.path.exists(cache_path):
+            cached = pd.read_parquet(cache_path)
+            if cached.attrs.pop('source_signature', None) == signature:
+                return cached
+    except Exception as e:
+        print(f"Error reading cached data: {e}")
+
+    data = load_and_preprocess_data(file_path)
+    try:
+        if signature is not None and not data.empty:
+            data.attrs['source_signature'] = signature
+            data.to_parquet(cache_path, compression='zstd')
+            data.attrs.pop('source_signature')
+    except Exception as e:
+        print(f"Error caching preprocessed data: {e}")
+    return data
+
 def handle_missing_values(data):
     try:
         # Grouping Airlines, Calculating median value of DelayMinutes of each group and Replacing NAN values with the respective group's median
-        data['DelayMinutes'] = data.groupby('Airline')['DelayMinutes'].transform(lambda x: x.fillna(x.median()))
+        airline_medians = data.groupby('Airline', observed=True)['DelayMinutes'].median().astype('float32')
+        data['DelayMinutes'] = data['DelayMinutes'].fillna(data['Airline'].map(airline_medians)).astype('float32')
         return data
     except Exception as e:
         print(f"Error handling missing values: {e}")
         return data
 
+def prompt_entries_to_keep(entries):
+    # Prompting once for the indices of the listed entries to keep, instead of asking about each entry separately
+    while True:
+        user_input = input("Enter indices to KEEP (comma-separated), or blank to drop all: ").strip()
+        if not user_input:
+            return entries.index[:0]
+        try:
+            keep_indices = pd.Index([int(value) for value in user_input.split(',')]).unique()
+        except ValueError:
+            print("Please enter whole-number indices separated by commas.")
+            continue
+        unknown = keep_indices.difference(entries.index)
+        if unknown.empty:
+            return keep_indices
+        print(f"Indices not among the listed entries: {', '.join(map(str, unknown))}")
+
 def remove_duplicates(data):
     try:
         # Identifying Duplicates based on combination of the FlightNumber, DepartureDate, and DepartureTime columns
@@ -65,16 +196,11 @@ def remove_duplicates(data):
                     print("Please enter 'yes' or 'no'.")
 
             if user_input == 'yes':
-                entries_to_keep = []
-                # Prompt to select the duplicate entries to be removed
-                for index, row in duplicate_entries.iterrows():
-                    print(f"\nDuplicate Entry: {row.to_dict()}")
-                    keep_input = input("Do you want to keep this entry? (yes/no): ").strip().lower()
-                    if keep_input == 'yes':
-                        entries_to_keep.append(index)
+                # Prompt to select the duplicate entries to be kept
+                entries_to_keep = prompt_entries_to_keep(duplicate_entries)
                 # Storing the clean dataframe with duplicates removed
-                data_cleaned = data.drop_duplicates(subset=['FlightNumber', 'DepartureDate', 'DepartureTime'], keep=False)
-                data_cleaned = pd.concat([data_cleaned, data.loc[entries_to_keep]]).drop_duplicates()
+                keep_mask = ~duplicates | data.index.isin(entries_to_keep)
+                data_cleaned = data[keep_mask]
                 return data_cleaned
 
         return data
@@ -82,22 +208,26 @@ def remove_duplicates(data):
         print(f"Error removing duplicates: {e}")
         return data
 
+def minutes_of_day(times):
+    # Converting HH:MM strings to int16 minutes since midnight, parsing each distinct value once; missing or invalid times become -1
+    codes, unique_times = pd.factorize(times)
+    parsed_times = pd.to_datetime(unique_times, format='%H:%M', errors='coerce')
+    unique_minutes = np.where(parsed_times.isna(), -1, parsed_times.hour * 60 + parsed_times.minute).astype('int16')
+    # Code -1 marks a missing time and picks the -1 appended at the end
+    return np.append(unique_minutes, np.int16(-1))[codes]
+
 def handle_inconsistent_entries(data):
     try:
-        inconsistent_entries = []
-        added_indices = set()
-        
-        for index, row in data.iterrows():
-            departure_time = row['DepartureTime']
-            arrival_time = row['ArrivalTime']
-            flight_duration = row['FlightDuration (Minutes)']
-            # Identifying Inconsistent Entries entries where the ArrivalTime was recorded as being earlier than the DepartureTime on the same day, as well as for instances where the FlightDuration exceeded a reasonable threshold (e.g., 480 minutes)
-            if arrival_time < departure_time or flight_duration > 480:
-                if index not in added_indices:
-                    inconsistent_entries.append(row)
-                    added_indices.add(index)
+        # Identifying Inconsistent Entries entries where the ArrivalTime was recorded as being earlier than the DepartureTime on the same day, as well as for instances where the FlightDuration exceeded a reasonable threshold (e.g., 480 minutes)
+        # The times are compared as minutes since midnight instead of as HH:MM strings
+        flight_duration = data['FlightDuration (Minutes)'].to_numpy()
+        departure_minutes = minutes_of_day(data['DepartureTime'])
+        arrival_minutes = minutes_of_day(data['ArrivalTime'])
+        # Rows with a missing time (-1) are not compared
+        time_diff = np.where((departure_minutes >= 0) & (arrival_minutes >= 0), arrival_minutes - departure_minutes, 0)
+        inconsistent_mask = (time_diff < 0) | (flight_duration > 480)
         # These entries were stored in another dataframe
-        inconsistent_df = pd.DataFrame(inconsistent_entries)
+        inconsistent_df = data.loc[inconsistent_mask]
         
         if not inconsistent_df.empty:
             print("\nInconsistent entries found:")
@@ -111,17 +241,11 @@ def handle_inconsistent_entries(data):
                     print("Please enter 'yes' or 'no'.")
             
             if user_input == 'yes':
-                entries_to_keep = []
-                for index, row in inconsistent_df.iterrows():
-                    print(f"\nInconsistent Entry: {row.to_dict()}")
-                    # Prompt to select the inconsistent entries to be removed
-                    keep_input = input("Do you want to keep this entry? (yes/no): ").strip().lower()
-                    if keep_input == 'yes':
-                        entries_to_keep.append(index)
+                # Prompt to select the inconsistent entries to be kept
+                entries_to_keep = prompt_entries_to_keep(inconsistent_df)
                 # Storing the dataframe with marked entries removed
-                cleaned_data = data.drop(index=added_indices).reset_index(drop=True)
-                retained_entries = data.loc[entries_to_keep]
-                cleaned_data = pd.concat([cleaned_data, retained_entries]).drop_duplicates().reset_index(drop=True)
+                keep_mask = ~inconsistent_mask | data.index.isin(entries_to_keep)
+                cleaned_data = data.loc[keep_mask].reset_index(drop=True)
 
                 return cleaned_data, inconsistent_df
 
@@ -134,9 +258,14 @@ def plot_delay_by_airline(data):
     # Plotting Line Chart of Flight Delay Minutes by Airlines
     try:
         plt.figure(figsize=(12, 6))
-        for airline, group in data.groupby('Airline'):
-            group_sorted = group.sort_values(by='DepartureDate')
-            plt.plot(group_sorted['DepartureDate'], group_sorted['DelayMinutes'], marker='o', label=airline)
+        # Sorting once by Airline and DepartureDate so that every group is already in date order
+        data_sorted = data.sort_values(by=['Airline', 'DepartureDate'], kind='stable')
+        # Collecting the row positions of every airline in one groupby pass and slicing the column arrays with them
+        airline_rows = data_sorted.groupby('Airline', observed=True, sort=False).indices
+        departure_dates = data_sorted['DepartureDate'].to_numpy()
+        delay_minutes = data_sorted['DelayMinutes'].to_numpy()
+        for airline, rows in airline_rows.items():
+            plt.plot(departure_dates[rows], delay_minutes[rows], marker='o', label=airline)
         plt.title('Flight Delay Minutes by Airline')
         plt.xlabel('Departure Date')
         plt.ylabel('Delay Minutes')
@@ -153,13 +282,16 @@ def plot_delay_by_airline(data):
 def plot_delay_histogram(data, column='DelayMinutes', bins=15):
     # Plotting Histogram of Flight Delays for Delay Distribution
     try:
+        values = data[column].to_numpy(dtype=float, na_value=np.nan)
+        values = values[~np.isnan(values)]
+        max_value = values.max()
         plt.figure(figsize=(10, 6))
-        plt.hist(data[column].dropna(), bins=bins, color='blue', alpha=0.7, edgecolor='black')
+        plt.hist(values, bins=bins, color='blue', alpha=0.7, edgecolor='black')
         plt.title('Distribution of Delay Minutes')
         plt.xlabel('Delay Minutes')
         plt.ylabel('Frequency')
         plt.grid(axis='y', alpha=0.75)
-        plt.xticks(range(0, int(data[column].max()) + 10, 10))  
+        plt.xticks(np.arange(0, int(max_value) + 10, 10))
         plt.show()
     except Exception as e:
         print(f"Error plotting histogram for delay distribution: {e}")
@@ -167,7 +299,7 @@ def plot_delay_histogram(data, column='DelayMinutes', bins=15):
 def calculate_average_delay_per_airline(data):
     # Calculating the Average Delay observed for each Airline
     try:
-        average_delay_per_airline = data.groupby('Airline')['DelayMinutes'].mean().reset_index()
+        average_delay_per_airline = data.groupby('Airline', observed=True)['DelayMinutes'].mean().reset_index()
         average_delay_per_airline.rename(columns={'DelayMinutes': 'AverageDelay (in Minutes)'}, inplace=True)
         return average_delay_per_airline
     except Exception as e:
@@ -177,12 +309,16 @@ def calculate_average_delay_per_airline(data):
 def analyze_delay_by_departure_time(data):
     # Calculating the Average Delay observed for each Airline
     try:
-        # Convert 'DepartureDate' and 'DepartureTime' to a datetime object
-        data['DepartureDatetime'] = pd.to_datetime(data['DepartureDate'].astype(str) + ' ' + data['DepartureTime'])
-        data['DepartureTimeOnly'] = data['DepartureDatetime'].dt.time
+        # Combine 'DepartureDate' and 'DepartureTime' into a datetime object without re-parsing the dates
+        departure_time = pd.to_timedelta(data['DepartureTime'] + ':00')
+        data['DepartureDatetime'] = data['DepartureDate'] + departure_time
+        # Store the departure time as minutes since midnight so that the groupby runs on small integers
+        data['DepartureTimeOnly'] = (departure_time // pd.Timedelta(minutes=1)).astype('Int16')
         # Calculate average delay per departure time
         avg_delay_per_time = data.groupby('DepartureTimeOnly')['DelayMinutes'].mean().reset_index()
         avg_delay_per_time.columns = ['Departure Time', 'Average Delay (Minutes)']
+        # Convert the minutes back to times of day for display
+        avg_delay_per_time['Departure Time'] = pd.to_datetime(avg_delay_per_time['Departure Time'].astype('int64'), unit='m').dt.time
         
         # Plot the average delay by departure time
         plt.figure(figsize=(12, 6))
@@ -219,17 +355,26 @@ def plot_delay_distribution_by_airline(data):
 
 def save_to_sqlite(data, db_name='flights.db'):
     # Save dataframe to SQLite database
+    conn = None
     try:
         conn = sqlite3.connect(db_name)
-        data.to_sql('flights', conn, if_exists='replace', index=False)
-        conn.close()
+        # Journaling and fsync are switched off, intentionally trading durability for a faster write of the flights table;
+        # a crash during the write can corrupt the whole flights.db file, including any other tables stored in it
+        conn.execute('PRAGMA journal_mode=OFF')
+        conn.execute('PRAGMA synchronous=OFF')
+        # Inserting several rows per INSERT statement while staying within SQLite's default limit of 999 bound variables
+        chunksize = max(1, 999 // max(1, len(data.columns)))
+        data.to_sql('flights', conn, if_exists='replace', index=False, method='multi', chunksize=chunksize)
     except Exception as e:
         print(f"Error saving data to SQLite: {e}")
+    finally:
+        if conn is not None:
+            conn.close()
 
 def main():
     try:
         # Load and preprocess data
-        data = load_and_preprocess_data('flights.csv')
+        data = load_with_cache('flights.csv')
         
         # Handle missing values
         data = handle_missing_values(data)
@@ -239,7 +384,10 @@ def main():
         
         # Handle inconsistent entries
         data, inconsistent_entries = handle_inconsistent_entries(data)
-        data.sort_values(by='FlightNumber', inplace=True)
+        # Dropping categories left without rows by the cleaning steps so that they do not appear in the plots
+        for column in CATEGORICAL_COLUMNS:
+            if column in data and isinstance(data[column].dtype, pd.CategoricalDtype):
+                data[column] = data[column].cat.remove_unused_categories()
 
         # Export cleaned DataFrame to CSV
         data.to_csv('transformed_dataset.csv', index=False)